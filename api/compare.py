@@ -3,9 +3,11 @@ Multi-market comparison endpoints
 """
 from fastapi import APIRouter, HTTPException, Query
 from typing import List
-from datetime import datetime
-from models import MarketComparison, MarketSummary
+from models import MarketComparison
 from services import injective_service
+from utils import now_iso
+import asyncio
+import numpy as np
 
 router = APIRouter()
 
@@ -36,15 +38,12 @@ async def compare_markets(
             detail="Maximum 10 markets can be compared at once"
         )
     
-    # Fetch summaries for all markets
-    summaries = []
-    for market_id in market_ids:
-        try:
-            summary = await injective_service.get_market_summary(market_id)
-            if summary:
-                summaries.append(MarketSummary(**summary))
-        except:
-            continue
+    # Fetch summaries for all markets concurrently
+    results = await asyncio.gather(
+        *[injective_service.get_market_summary_model(market_id) for market_id in market_ids],
+        return_exceptions=True,
+    )
+    summaries = [s for s in results if s and not isinstance(s, Exception)]
     
     if not summaries:
         raise HTTPException(
@@ -52,13 +51,17 @@ async def compare_markets(
             detail="No valid markets found"
         )
     
+    count = len(summaries)
+    price_changes = np.fromiter((s.price_change_24h for s in summaries), dtype=np.float64, count=count)
+    volumes = np.fromiter((s.volume_24h for s in summaries), dtype=np.float64, count=count)
+    
     # Find best and worst performers
-    best = max(summaries, key=lambda x: x.price_change_24h)
-    worst = min(summaries, key=lambda x: x.price_change_24h)
+    best = summaries[int(price_changes.argmax())]
+    worst = summaries[int(price_changes.argmin())]
     
     # Calculate averages
-    avg_volume = sum(s.volume_24h for s in summaries) / len(summaries)
-    avg_price_change = sum(s.price_change_24h for s in summaries) / len(summaries)
+    avg_volume = float(volumes.mean())
+    avg_price_change = float(price_changes.mean())
     
     return MarketComparison(
         markets=market_ids,
@@ -67,5 +70,5 @@ async def compare_markets(
         average_volume=round(avg_volume, 2),
         average_price_change=round(avg_price_change, 2),
         data=summaries,
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=now_iso(),
     )
@@ -2,8 +2,8 @@
 Health check endpoints
 """
 from fastapi import APIRouter
-from datetime import datetime
 from config import settings
+from utils import now_iso
 from models import HealthStatus
 from services import injective_service
 
@@ -21,7 +21,7 @@ async def health_check():
         status="healthy",
         version=settings.api_version,
         network=settings.network,
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=now_iso(),
         cache_size=len(injective_service._cache),
     )
 
@@ -33,9 +33,9 @@ async def clear_cache():
     
     Useful for forcing fresh data retrieval from Injective network.
     """
-    injective_service.clear_cache()
+    await injective_service.clear_cache()
     return {
         "status": "success",
         "message": "Cache cleared",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": now_iso(),
     }
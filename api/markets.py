@@ -1,7 +1,8 @@
 """
 Market data endpoints
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 from models import MarketInfo, MarketSummary, Orderbook, Trade
 from services import injective_service
@@ -42,7 +43,9 @@ async def get_market_summary(market_id: str):
     return summary
 
 
-@router.get("/{market_id}/orderbook", response_model=Orderbook)
+# Orderbook and trades payloads are built by the service and returned as-is;
+# the models below only document the response schema.
+@router.get("/{market_id}/orderbook", responses={200: {"model": Orderbook}})
 async def get_orderbook(
     market_id: str,
     depth: int = Query(20, ge=1, le=100, description="Number of price levels to return")
@@ -53,19 +56,15 @@ async def get_orderbook(
     Returns the current bid and ask levels for a market.
     Default depth is 20 levels, maximum is 100.
     """
-    orderbook = await injective_service.get_orderbook(market_id)
+    orderbook = await injective_service.get_orderbook(market_id, depth)
     
     if not orderbook:
         raise HTTPException(status_code=404, detail=f"Orderbook for market {market_id} not found")
     
-    # Limit depth
-    orderbook["bids"] = orderbook["bids"][:depth]
-    orderbook["asks"] = orderbook["asks"][:depth]
-    
-    return orderbook
+    return ORJSONResponse(content=orderbook)
 
 
-@router.get("/{market_id}/trades", response_model=List[Trade])
+@router.get("/{market_id}/trades", responses={200: {"model": List[Trade]}})
 async def get_recent_trades(
     market_id: str,
     limit: int = Query(50, ge=1, le=500, description="Number of trades to return")
@@ -76,10 +75,6 @@ async def get_recent_trades(
     Returns the most recent trades for a market.
     Default limit is 50 trades, maximum is 500.
     """
-    trades = await injective_service.get_recent_trades(market_id, limit)
-    
-    if not trades:
-        # Return empty list instead of 404 for consistency
-        return []
-    
-    return trades
+    # An empty list is returned instead of 404 for consistency
+    payload = await injective_service.get_recent_trades_payload(market_id, limit)
+    return Response(content=payload, media_type="application/json")
@@ -2,67 +2,37 @@
 Market metrics and analytics endpoints
 """
 from fastapi import APIRouter, HTTPException, Query
+from pydantic import TypeAdapter
 from typing import List
-from datetime import datetime
 from models import MarketMetrics, TrendingMarket, MarketSignal
 from services import injective_service
-import statistics
+from services.analytics import calculate_volatility
+from utils import now_iso
+import asyncio
+import heapq
 
 router = APIRouter()
 
-
-async def calculate_volatility(trades: List[dict]) -> float:
-    """Calculate price volatility from recent trades"""
-    if len(trades) < 2:
-        return 0.0
-    
-    prices = [trade["price"] for trade in trades if trade["price"] > 0]
-    if len(prices) < 2:
-        return 0.0
-    
-    try:
-        return statistics.stdev(prices)
-    except:
-        return 0.0
+_TRENDING_ADAPTER = TypeAdapter(List[TrendingMarket])
 
 
-async def calculate_spread(orderbook: dict) -> float:
-    """Calculate bid-ask spread percentage"""
-    if not orderbook or not orderbook.get("bids") or not orderbook.get("asks"):
-        return 0.0
+async def fetch_market_data(market_id: str):
+    """Fetch summary, orderbook stats and recent trades for a market concurrently"""
+    summary, orderbook_stats, trades = await asyncio.gather(
+        injective_service.get_market_summary(market_id),
+        injective_service.get_orderbook_stats(market_id),
+        injective_service.get_recent_trades(market_id, 100),
+        return_exceptions=True,
+    )
     
-    try:
-        best_bid = orderbook["bids"][0]["price"]
-        best_ask = orderbook["asks"][0]["price"]
-        
-        if best_bid <= 0 or best_ask <= 0:
-            return 0.0
-        
-        spread = ((best_ask - best_bid) / best_ask) * 100
-        return round(spread, 4)
-    except:
-        return 0.0
-
-
-async def calculate_liquidity_score(orderbook: dict) -> float:
-    """Calculate liquidity score based on orderbook depth"""
-    if not orderbook:
-        return 0.0
+    if isinstance(summary, Exception):
+        summary = None
+    if isinstance(orderbook_stats, Exception) or not orderbook_stats:
+        orderbook_stats = {"spread_percentage": 0.0, "liquidity_score": 0.0}
+    if isinstance(trades, Exception):
+        trades = []
     
-    try:
-        bids = orderbook.get("bids", [])
-        asks = orderbook.get("asks", [])
-        
-        # Calculate total volume in top 10 levels
-        bid_volume = sum(level["quantity"] for level in bids[:10])
-        ask_volume = sum(level["quantity"] for level in asks[:10])
-        total_volume = bid_volume + ask_volume
-        
-        # Normalize to 0-100 scale (arbitrary scaling)
-        score = min(total_volume / 1000, 100)
-        return round(score, 2)
-    except:
-        return 0.0
+    return summary, orderbook_stats, trades
 
 
 @router.get("/{market_id}", response_model=MarketMetrics)
@@ -74,17 +44,14 @@ async def get_market_metrics(market_id: str):
     and trading signals for a specific market.
     """
     # Fetch data
-    summary = await injective_service.get_market_summary(market_id)
+    summary, orderbook_stats, trades = await fetch_market_data(market_id)
     if not summary:
         raise HTTPException(status_code=404, detail=f"Market {market_id} not found")
     
-    orderbook = await injective_service.get_orderbook(market_id)
-    trades = await injective_service.get_recent_trades(market_id, 100)
-    
     # Calculate metrics
-    volatility = await calculate_volatility(trades)
-    spread = await calculate_spread(orderbook) if orderbook else 0.0
-    liquidity = await calculate_liquidity_score(orderbook) if orderbook else 0.0
+    volatility = calculate_volatility(trades)
+    spread = orderbook_stats["spread_percentage"]
+    liquidity = orderbook_stats["liquidity_score"]
     
     # Determine trends
     volume_trend = "stable"
@@ -107,7 +74,7 @@ async def get_market_metrics(market_id: str):
         liquidity_score=liquidity,
         volume_trend=volume_trend,
         price_momentum=price_momentum,
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=now_iso(),
     )
 
 
@@ -121,32 +88,24 @@ async def get_trending_markets(
     Returns top markets sorted by volume and price change.
     Useful for discovering active trading opportunities.
     """
-    markets = await injective_service.get_all_markets()
-    
-    trending = []
-    for market in markets[:50]:  # Limit API calls
-        try:
-            summary = await injective_service.get_market_summary(market["market_id"])
-            if summary and summary["volume_24h"] > 0:
-                trending.append(TrendingMarket(
-                    market_id=market["market_id"],
-                    ticker=market["ticker"],
-                    type=market["type"],
-                    price_change_24h=summary["price_change_24h"],
-                    volume_24h=summary["volume_24h"],
-                    rank=0,
-                ))
-        except:
-            continue
-    
-    # Sort by volume
-    trending.sort(key=lambda x: x.volume_24h, reverse=True)
-    
-    # Assign ranks
-    for i, market in enumerate(trending[:limit]):
-        market.rank = i + 1
-    
-    return trending[:limit]
+    summaries = await injective_service.get_all_market_summaries()
+    
+    # Keep the top markets by volume
+    active = (s for s in summaries.values() if s["volume_24h"] > 0)
+    top = heapq.nlargest(limit, active, key=lambda s: s["volume_24h"])
+    
+    # Assign ranks and validate the whole list in one pass
+    return _TRENDING_ADAPTER.validate_python([
+        {
+            "market_id": summary["market_id"],
+            "ticker": summary["ticker"],
+            "type": summary["type"],
+            "price_change_24h": summary["price_change_24h"],
+            "volume_24h": summary["volume_24h"],
+            "rank": i + 1,
+        }
+        for i, summary in enumerate(top)
+    ])
 
 
 @router.get("/{market_id}/signals", response_model=MarketSignal)
@@ -157,19 +116,16 @@ async def get_market_signals(market_id: str):
     Returns simple buy/sell/hold signals based on technical indicators.
     This is for informational purposes only and not financial advice.
     """
-    summary = await injective_service.get_market_summary(market_id)
+    summary, orderbook_stats, trades = await fetch_market_data(market_id)
     if not summary:
         raise HTTPException(status_code=404, detail=f"Market {market_id} not found")
     
-    orderbook = await injective_service.get_orderbook(market_id)
-    trades = await injective_service.get_recent_trades(market_id, 100)
-    
     # Simple signal calculation
     indicators = {
         "price_change_24h": summary["price_change_24h"],
         "volume_24h": summary["volume_24h"],
-        "spread": await calculate_spread(orderbook) if orderbook else 0.0,
-        "volatility": await calculate_volatility(trades),
+        "spread": orderbook_stats["spread_percentage"],
+        "volatility": calculate_volatility(trades),
     }
     
     # Determine signal
@@ -189,5 +145,5 @@ async def get_market_signals(market_id: str):
         signal=signal,
         strength=round(strength, 2),
         indicators=indicators,
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=now_iso(),
     )
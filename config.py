@@ -2,7 +2,21 @@
 Configuration management for the Injective Market Analytics API
 """
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import List, Literal
+import os
+
+
+def _available_cpus() -> int:
+    """CPUs this process may run on, honouring CPU affinity and a cgroup v2 CPU quota"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(int(quota) // int(period), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
 
 
 class Settings(BaseSettings):
@@ -12,10 +26,20 @@ class Settings(BaseSettings):
     network: Literal["mainnet", "testnet"] = "testnet"
     grpc_endpoint: str = ""
     lcd_endpoint: str = ""
+    grpc_pool_size: int = 1
+    grpc_keepalive_time_ms: int = 300000  # faster pings need the upstream to permit them
+    grpc_ping_interval_seconds: int = 60  # indexer Ping RPC that keeps idle connections open; 0 disables
+    grpc_keepalive_timeout_ms: int = 10000
+    upstream_concurrency: int = 16
+    batch_interval_ms: int = 5
+    max_batch_size: int = 20
     
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    # One per available CPU, capped because every worker opens its own gRPC clients and streams
+    api_workers: int = min(_available_cpus(), 4)
+    debug: bool = False
     api_title: str = "Injective Market Analytics API"
     api_version: str = "1.0.0"
     api_description: str = """
@@ -28,9 +52,19 @@ class Settings(BaseSettings):
     - Multi-market comparison tools
     """
     
-    # Cache Configuration
+    # CORS - credentials are only allowed when origins are listed explicitly
+    cors_origins: List[str] = ["*"]
+    
+    # Cache Configuration - cache_ttl_seconds covers the market list and anything without its own TTL
     cache_ttl_seconds: int = 60
+    summary_cache_ttl_seconds: int = 10
+    orderbook_cache_ttl_seconds: int = 2
+    trades_cache_ttl_seconds: int = 5
+    orderbook_stream_idle_seconds: int = 60  # 0 disables orderbook streaming
+    orderbook_stream_retry_seconds: int = 30  # wait before resubscribing a market whose stream failed
+    max_orderbook_streams: int = 100  # per worker
     max_cache_size: int = 1000
+    redis_url: str = ""  # e.g. redis://localhost:6379/0 to share the cache across workers
     
     # Rate Limiting
     rate_limit_requests: int = 100
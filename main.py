@@ -4,9 +4,14 @@ Main application entry point
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from config import settings
 from api import markets, metrics, compare, health
+from middleware import CacheHeadersMiddleware
+from services import injective_service
+from utils import setup_logging
+import logging
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -15,17 +20,34 @@ app = FastAPI(
     description=settings.api_description,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware for web applications
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=settings.cors_origins,
+    allow_credentials="*" not in settings.cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# ETag / Cache-Control on API GETs so browsers and proxies can revalidate cheaply.
+# max-age follows the shortest data TTL so clients never hold data staler than the server's.
+app.add_middleware(
+    CacheHeadersMiddleware,
+    max_age=min(
+        settings.cache_ttl_seconds,
+        settings.summary_cache_ttl_seconds,
+        settings.orderbook_cache_ttl_seconds,
+        settings.trades_cache_ttl_seconds,
+    ),
+)
+
+# Compress large JSON payloads (orderbooks, trades, trending) for clients that accept gzip.
+# Added after the cache-header middleware so ETags hash the uncompressed body.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(health.router, tags=["Health"])
 app.include_router(markets.router, prefix="/api/v1/markets", tags=["Markets"])
@@ -42,6 +64,10 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    # Log output is written from a background thread, never from the event loop
+    app.state.log_listener = setup_logging(logging.DEBUG if settings.debug else logging.INFO)
+    # Open the shared Injective client once so requests never pay for channel setup
+    await injective_service.initialize()
     print(f"🚀 Starting {settings.api_title} v{settings.api_version}")
     print(f"📡 Network: {settings.network}")
     print(f"📚 Documentation: http://{settings.api_host}:{settings.api_port}/docs")
@@ -50,7 +76,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await injective_service.close()
     print("👋 Shutting down API")
+    app.state.log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -59,5 +87,10 @@ if __name__ == "__main__":
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True,
+        reload=settings.debug,
+        # Reload mode only supports a single worker
+        workers=1 if settings.debug else settings.api_workers,
+        # "auto" picks uvloop and httptools wherever they are installed (not on Windows)
+        loop="auto",
+        http="auto",
     )
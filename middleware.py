@@ -0,0 +1,80 @@
+"""
+HTTP caching middleware for the Injective Market Analytics API
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import hashlib
+
+
+class CacheHeadersMiddleware:
+    """
+    Add ETag and Cache-Control headers to successful GET responses.
+    
+    The ETag is a BLAKE2b hash of the response body. Requests whose
+    If-None-Match header matches it get an empty 304 response carrying the
+    same headers (CORS, Vary) as the full response would.
+    
+    The ETag is weak because compression is applied outside this middleware,
+    so gzip and identity responses share it.
+    """
+    
+    def __init__(self, app: ASGIApp, max_age: int, path_prefix: str = "/api/"):
+        self.app = app
+        self.max_age = max_age
+        self.path_prefix = path_prefix
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        start_message: Message = {}
+        chunks = []
+        passthrough = False
+        
+        async def send_with_cache_headers(message: Message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            
+            if passthrough:
+                await send(message)
+                return
+            
+            # Buffer the body so the ETag covers the complete payload
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            body = b"".join(chunks)
+            opaque_tag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            headers = MutableHeaders(scope=start_message)
+            headers["ETag"] = f"W/{opaque_tag}"
+            headers["Cache-Control"] = f"public, max-age={self.max_age}"
+            
+            # If-None-Match uses weak comparison, so a strong or weak client tag matches
+            client_tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+            if if_none_match == "*" or opaque_tag in client_tags:
+                # Keep every header but the ones describing the body that is left out
+                for name in ("content-length", "content-type", "content-encoding"):
+                    del headers[name]
+                # GZip only adds this when it compresses, which an empty 304 never is
+                headers.add_vary_header("Accept-Encoding")
+                await send({**start_message, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_with_cache_headers)
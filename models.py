@@ -1,12 +1,17 @@
 """
 Pydantic models for API requests and responses
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Literal
 from datetime import datetime
 
 
-class MarketInfo(BaseModel):
+class APIModel(BaseModel):
+    """Base model for API payloads - immutable so cached instances can be shared safely"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+
+class MarketInfo(APIModel):
     """Basic market information"""
     market_id: str
     ticker: str
@@ -18,7 +23,7 @@ class MarketInfo(BaseModel):
     oracle_type: Optional[str] = None
 
 
-class MarketSummary(BaseModel):
+class MarketSummary(APIModel):
     """Market summary with price and volume"""
     market_id: str
     ticker: str
@@ -29,13 +34,13 @@ class MarketSummary(BaseModel):
     timestamp: str
 
 
-class OrderbookLevel(BaseModel):
+class OrderbookLevel(APIModel):
     """Single orderbook level"""
     price: float
     quantity: float
 
 
-class Orderbook(BaseModel):
+class Orderbook(APIModel):
     """Orderbook data"""
     market_id: str
     type: Literal["spot", "derivative"]
@@ -44,7 +49,7 @@ class Orderbook(BaseModel):
     timestamp: str
 
 
-class Trade(BaseModel):
+class Trade(APIModel):
     """Trade data"""
     price: float
     quantity: float
@@ -52,7 +57,7 @@ class Trade(BaseModel):
     side: str
 
 
-class MarketMetrics(BaseModel):
+class MarketMetrics(APIModel):
     """Derived market metrics"""
     market_id: str
     ticker: str
@@ -64,7 +69,7 @@ class MarketMetrics(BaseModel):
     timestamp: str
 
 
-class TrendingMarket(BaseModel):
+class TrendingMarket(APIModel):
     """Trending market information"""
     market_id: str
     ticker: str
@@ -74,7 +79,7 @@ class TrendingMarket(BaseModel):
     rank: int
 
 
-class MarketSignal(BaseModel):
+class MarketSignal(APIModel):
     """Trading signal for a market"""
     market_id: str
     ticker: str
@@ -84,7 +89,7 @@ class MarketSignal(BaseModel):
     timestamp: str
 
 
-class MarketComparison(BaseModel):
+class MarketComparison(APIModel):
     """Comparison between multiple markets"""
     markets: List[str]
     best_performer: str
@@ -95,7 +100,7 @@ class MarketComparison(BaseModel):
     timestamp: str
 
 
-class HealthStatus(BaseModel):
+class HealthStatus(APIModel):
     """API health status"""
     status: str
     version: str
@@ -0,0 +1,60 @@
+"""
+Derived market analytics computed from trades and orderbooks
+"""
+from typing import List
+from itertools import chain
+import numpy as np
+
+
+def calculate_volatility(trades: List[dict]) -> float:
+    """Calculate price volatility (sample standard deviation) from recent trades"""
+    if len(trades) < 2:
+        return 0.0
+    
+    prices = np.fromiter(
+        (trade["price"] for trade in trades if trade["price"] > 0),
+        dtype=np.float64,
+    )
+    if prices.size < 2:
+        return 0.0
+    
+    return float(prices.std(ddof=1))
+
+
+def calculate_spread(orderbook: dict) -> float:
+    """Calculate bid-ask spread percentage"""
+    if not orderbook or not orderbook.get("bids") or not orderbook.get("asks"):
+        return 0.0
+    
+    try:
+        best_bid = orderbook["bids"][0]["price"]
+        best_ask = orderbook["asks"][0]["price"]
+        
+        if best_bid <= 0 or best_ask <= 0:
+            return 0.0
+        
+        spread = ((best_ask - best_bid) / best_ask) * 100
+        return round(spread, 4)
+    except:
+        return 0.0
+
+
+def calculate_liquidity_score(orderbook: dict) -> float:
+    """Calculate liquidity score based on orderbook depth"""
+    if not orderbook:
+        return 0.0
+    
+    try:
+        bids = orderbook.get("bids", [])
+        asks = orderbook.get("asks", [])
+        
+        # Calculate total volume in top 10 levels of both sides in one pass
+        total_volume = 0.0
+        for level in chain(bids[:10], asks[:10]):
+            total_volume += level["quantity"]
+        
+        # Normalize to 0-100 scale (arbitrary scaling)
+        score = min(total_volume / 1000, 100)
+        return round(score, 2)
+    except:
+        return 0.0
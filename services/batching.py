@@ -0,0 +1,73 @@
+"""
+Request batching for upstream Injective calls
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+
+
+class BatchQueue:
+    """
+    Coalesce single-key lookups into batched upstream calls.
+    
+    Keys submitted within `interval` seconds of the first pending key, up to
+    `max_batch_size` keys, are resolved together by one call to
+    `fetch_batch`. That call returns a dict mapping each key to its result.
+    Keys missing from the dict resolve to None.
+    """
+    
+    def __init__(
+        self,
+        fetch_batch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        interval: float,
+        max_batch_size: int,
+    ):
+        self._fetch_batch = fetch_batch
+        self._interval = interval
+        self._max_batch_size = max_batch_size
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def submit(self, key: str) -> Any:
+        """Queue a key for the next batch and wait for its result"""
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            
+            if len(self._pending) >= self._max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self._interval, self._flush)
+        
+        return await asyncio.shield(future)
+    
+    def _flush(self):
+        """Send every pending key upstream as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: Dict[str, asyncio.Future]):
+        """Resolve the futures of a batch from a single upstream call"""
+        try:
+            results = await self._fetch_batch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark the exception as retrieved in case every waiter was cancelled
+                    future.exception()
+            return
+        
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
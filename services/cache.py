@@ -0,0 +1,216 @@
+"""
+Two-tier response cache: process-local LRU cache with per-entry expiry backed by an optional shared Redis
+"""
+from typing import Any, Dict, Optional
+from cachetools import LRUCache
+import redis.asyncio as redis
+import orjson
+import asyncio
+import logging
+import time
+import uuid
+
+log = logging.getLogger(__name__)
+
+# Message telling every worker to drop its whole local cache
+_CLEAR_ALL = "*"
+
+
+class TwoTierCache:
+    """
+    Cache shared by every API worker.
+    
+    Lookups hit the local cache first and fall back to Redis, so workers
+    reuse each other's upstream results instead of each fetching them. Without
+    a `redis_url` the cache is local only. Invalidations are broadcast over
+    pub/sub so other workers drop their local copies too.
+    
+    Values are held as orjson bytes and decoded on each hit, so a cached
+    orderbook is one object for the garbage collector instead of hundreds.
+    
+    `ttls` overrides the TTL per key prefix (the part before the first ':'),
+    each prefix getting its own local cache. Other keys use `ttl`. `maxsize`
+    bounds the local tier as a whole and is split evenly between its caches.
+    
+    Local entries are `(expires_at, payload)` pairs in an LRUCache, checked
+    against the monotonic clock when read, so lookups skip TTLCache's eager
+    expiry pass.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: int,
+        redis_url: str = "",
+        namespace: str = "shared:injective:",
+        ttls: Optional[Dict[str, int]] = None,
+    ):
+        self._ttl = ttl
+        self._ttls = ttls or {}
+        local_maxsize = max(maxsize // (len(self._ttls) + 1), 1)
+        self._default_local = LRUCache(maxsize=local_maxsize)
+        self._locals = {prefix: LRUCache(maxsize=local_maxsize) for prefix in self._ttls}
+        self._redis_url = redis_url
+        self._namespace = namespace
+        self._channel = f"{namespace}invalidate"
+        self._redis: Optional[redis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+        # Identifies this worker's leases
+        self._owner = uuid.uuid4().hex.encode()
+    
+    def get(self, key: str) -> Any:
+        """Locally cached value, or None if missing or expired"""
+        payload = self.get_payload(key)
+        return None if payload is None else orjson.loads(payload)
+    
+    def get_payload(self, key: str) -> Optional[bytes]:
+        """Locally cached value as its encoded JSON bytes, without decoding it"""
+        local = self._local(key)
+        entry = local.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, payload = entry
+        if expires_at > time.monotonic():
+            return payload
+        local.pop(key, None)
+        return None
+    
+    def __len__(self) -> int:
+        return len(self._default_local) + sum(len(local) for local in self._locals.values())
+    
+    def _local(self, key: str) -> LRUCache:
+        """Local cache holding keys with this key's prefix"""
+        return self._locals.get(key.partition(":")[0], self._default_local)
+    
+    def _ttl_for(self, key: str) -> int:
+        """TTL in seconds for this key's prefix"""
+        return self._ttls.get(key.partition(":")[0], self._ttl)
+    
+    def _set_local(self, key: str, payload: bytes, ttl: Optional[float] = None):
+        """Store an encoded value locally until its TTL (the prefix TTL by default) runs out"""
+        if ttl is None:
+            ttl = self._ttl_for(key)
+        self._local(key)[key] = (time.monotonic() + ttl, payload)
+    
+    def _clear_local(self):
+        """Drop every locally cached entry"""
+        self._default_local.clear()
+        for local in self._locals.values():
+            local.clear()
+    
+    async def connect(self):
+        """Connect to Redis and start listening for invalidations"""
+        if self._redis_url and self._redis is None:
+            self._redis = redis.from_url(self._redis_url)
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+    
+    async def close(self):
+        """Stop the invalidation listener and close the Redis connection"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+    
+    async def get_shared(self, key: str) -> Any:
+        """Look a key up in Redis, filling the local cache on a hit"""
+        if self._redis is None:
+            return None
+        try:
+            async with self._redis.pipeline() as pipe:
+                raw, remaining_ms = await pipe.get(self._namespace + key).pttl(self._namespace + key).execute()
+        except Exception:
+            log.warning("Shared cache read error", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        
+        # Expire the local copy with the shared one, so data is never held past one TTL in total
+        ttl = self._ttl_for(key)
+        if remaining_ms >= 0:
+            ttl = min(remaining_ms / 1000, ttl)
+        self._set_local(key, raw, ttl)
+        return orjson.loads(raw)
+    
+    async def set(self, key: str, value: Any):
+        """Store a value locally and in Redis"""
+        payload = orjson.dumps(value)
+        self._set_local(key, payload)
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._namespace + key, payload, ex=self._ttl_for(key))
+            except Exception:
+                log.warning("Shared cache write error", exc_info=True)
+    
+    async def claim(self, name: str, ttl: float) -> bool:
+        """
+        Take or renew a lease so only one worker does a job; always granted without Redis.
+        
+        A Redis error also grants it, so each worker falls back to doing the job itself.
+        """
+        if self._redis is None:
+            return True
+        lease_key = f"{self._namespace}lease:{name}"
+        ttl_ms = int(ttl * 1000)
+        try:
+            if await self._redis.set(lease_key, self._owner, nx=True, px=ttl_ms):
+                return True
+            # Renew the lease if this worker already holds it
+            if await self._redis.get(lease_key) == self._owner:
+                await self._redis.pexpire(lease_key, ttl_ms)
+                return True
+            return False
+        except Exception:
+            log.warning("Shared cache lease error", exc_info=True)
+            return True
+    
+    async def release(self, name: str):
+        """Give up a lease if this worker holds it"""
+        if self._redis is None:
+            return
+        lease_key = f"{self._namespace}lease:{name}"
+        try:
+            if await self._redis.get(lease_key) == self._owner:
+                await self._redis.delete(lease_key)
+        except Exception:
+            log.warning("Shared cache lease error", exc_info=True)
+    
+    async def clear(self):
+        """Clear this cache everywhere: locally, in Redis and in every other worker"""
+        self._clear_local()
+        if self._redis is not None:
+            try:
+                keys = [key async for key in self._redis.scan_iter(match=f"{self._namespace}*")]
+                if keys:
+                    await self._redis.delete(*keys)
+                await self._redis.publish(self._channel, _CLEAR_ALL)
+            except Exception:
+                log.warning("Shared cache clear error", exc_info=True)
+    
+    async def _listen(self):
+        """Drop local entries invalidated by other workers"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    key = message["data"].decode()
+                    if key == _CLEAR_ALL:
+                        self._clear_local()
+                    else:
+                        self._local(key).pop(key, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("Shared cache invalidation error", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
@@ -2,324 +2,788 @@
 Injective blockchain client service
 Handles all interactions with Injective network
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterator, Sequence, Tuple
 from pyinjective.async_client import AsyncClient
 from pyinjective.core.network import Network
+from pyinjective.proto.exchange import (
+    injective_derivative_exchange_rpc_pb2 as derivative_exchange_pb,
+    injective_spot_exchange_rpc_pb2 as spot_exchange_pb,
+)
+from pyinjective.proto.injective.exchange.v1beta1 import query_pb2 as exchange_query_pb
+from pyinjective.proto.injective.oracle.v1beta1 import oracle_pb2 as oracle_pb
 from config import settings
-from cachetools import TTLCache
-from datetime import datetime
+from utils import now_iso
+from models import MarketSummary
+from services.analytics import calculate_spread, calculate_liquidity_score
+from services.batching import BatchQueue
+from services.cache import TwoTierCache
+from cachetools import LRUCache
+from itertools import cycle
+from decimal import Decimal
+import numpy as np
+import orjson
 import asyncio
+import logging
+import time
+import re
+import grpc
+
+log = logging.getLogger(__name__)
+
+# Injective typically uses 6 decimals for prices and 18 for quantities
+_PRICE_DIVISOR = 10.0 ** 6
+_QUANTITY_DIVISOR = 10.0 ** 18
+# Fallback (price, quantity) divisors for markets without token metadata
+_DEFAULT_SCALES = (_PRICE_DIVISOR, _QUANTITY_DIVISOR)
+# Chain decimals (mark and mid prices) are sent as integers carrying 18 extra decimals
+_CHAIN_DECIMAL_PLACES = 18
+
+# Cache keys are "<prefix>:<args>"; the prefix selects the TTL. Per-market keys are built inline.
+_ALL_MARKETS_KEY = "all_markets:"
+_ALL_MARKET_SUMMARIES_KEY = "all_market_summaries:"
+_MARKET_SCALES_KEY = "market_scales:"
+
+# Lifetime of the Redis lease that lets one worker stream a market's orderbook; renewed every third of it
+_STREAM_LEASE_SECONDS = 30
+
+# Market IDs are 32-byte hashes; anything else is rejected before it can fail a batched upstream call
+_MARKET_ID_PATTERN = re.compile(r"0x[0-9a-fA-F]{64}")
+
+# Oracle type enum values by number, named as MessageToDict would name them
+_ORACLE_TYPES = {number: name for name, number in oracle_pb.OracleType.items()}
+
+
+def _decode(raw: List[str], divisor: float) -> List[float]:
+    """Parse a batch of upstream decimal strings in one vectorized pass"""
+    try:
+        return (np.asarray(raw, dtype=np.float64) / divisor).tolist()
+    except (TypeError, ValueError):
+        # Fall back to per-value parsing so one malformed value only zeroes itself
+        values = []
+        for value in raw:
+            try:
+                values.append(float(value) / divisor)
+            except (TypeError, ValueError):
+                values.append(0.0)
+        return values
+
+
+async def _resolved(value: Any) -> Any:
+    """Awaitable standing in for an upstream call that does not need to be made"""
+    return value
+
+
+class KeepaliveNetwork(Network):
+    """
+    Network whose gRPC channels send HTTP/2 keepalive pings while calls are open.
+    
+    Pings only go out during calls such as the orderbook streams, so a dead
+    connection is noticed instead of hanging the call. gRPC servers on default
+    settings answer pings on idle connections, or more often than every 5
+    minutes, with GOAWAY too_many_pings, so the default interval is 5 minutes.
+    Idle connections are kept open by InjectiveService's periodic Ping RPC.
+    """
+    
+    def _create_grpc_channel(self, endpoint: str, credentials: Optional[grpc.ChannelCredentials]) -> grpc.aio.Channel:
+        options = [
+            ("grpc.keepalive_time_ms", settings.grpc_keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", settings.grpc_keepalive_timeout_ms),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+        if credentials is None:
+            return grpc.aio.insecure_channel(endpoint, options=options)
+        return grpc.aio.secure_channel(endpoint, credentials, options=options)
 
 
 class InjectiveService:
     """Service for interacting with Injective blockchain"""
     
     def __init__(self):
-        self.network = Network.testnet() if settings.network == "testnet" else Network.mainnet()
-        self.client: Optional[AsyncClient] = None
-        self._cache = TTLCache(maxsize=settings.max_cache_size, ttl=settings.cache_ttl_seconds)
+        self.network = KeepaliveNetwork.testnet() if settings.network == "testnet" else KeepaliveNetwork.mainnet()
+        self._clients: List[AsyncClient] = []
+        self._client_cycle: Optional[Iterator[AsyncClient]] = None
+        # Shared with the other workers through Redis when REDIS_URL is set.
+        # Fast-moving data gets shorter TTLs; the market list uses cache_ttl_seconds.
+        self._cache = TwoTierCache(
+            settings.max_cache_size,
+            settings.cache_ttl_seconds,
+            settings.redis_url,
+            ttls={
+                "market_summary": settings.summary_cache_ttl_seconds,
+                "all_market_summaries": settings.summary_cache_ttl_seconds,
+                "orderbook": settings.orderbook_cache_ttl_seconds,
+                "trades": settings.trades_cache_ttl_seconds,
+            },
+        )
+        # Keyed by market, reused only while the raw summary is unchanged, so no TTL is needed
+        self._summary_model_cache = LRUCache(maxsize=settings.max_cache_size)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # market_id -> "derivative" / "spot", learned from every market response
+        self._market_types: Dict[str, str] = {}
+        # Caps concurrent upstream RPCs across all requests (e.g. compare fan-out)
+        self._upstream_limit = asyncio.Semaphore(settings.upstream_concurrency)
+        # Per-market summary and orderbook lookups are coalesced into bulk calls
+        batch_interval = settings.batch_interval_ms / 1000
+        self._summary_batcher = BatchQueue(self._fetch_market_summaries, batch_interval, settings.max_batch_size)
+        self._orderbook_batcher = BatchQueue(self._fetch_orderbooks, batch_interval, settings.max_batch_size)
+        # Snapshot streams that keep requested markets' cached orderbooks fresh, and when each market was last read
+        self._orderbook_streams: Dict[str, asyncio.Task] = {}
+        self._orderbook_last_used: Dict[str, float] = {}
+        # Monotonic time before which a market whose stream ended without going idle is not resubscribed
+        self._orderbook_stream_retry_at: Dict[str, float] = {}
+        self._ping_task: Optional[asyncio.Task] = None
         self._initialized = False
     
     async def initialize(self):
-        """Initialize the Injective client"""
+        """Initialize the pool of Injective clients"""
         if not self._initialized:
-            self.client = AsyncClient(self.network)
+            # Each client owns its own chain and exchange gRPC channels
+            self._clients = [AsyncClient(self.network) for _ in range(max(settings.grpc_pool_size, 1))]
+            self._client_cycle = cycle(self._clients)
+            await self._cache.connect()
+            if settings.grpc_ping_interval_seconds > 0:
+                self._ping_task = asyncio.get_running_loop().create_task(self._ping_indexer())
             self._initialized = True
     
+    @property
+    def client(self) -> AsyncClient:
+        """Next Injective client from the pool (round-robin)"""
+        return next(self._client_cycle)
+    
     async def ensure_initialized(self):
         """Ensure client is initialized before use"""
         if not self._initialized:
             await self.initialize()
     
-    def _get_cache_key(self, prefix: str, *args) -> str:
-        """Generate cache key from prefix and arguments"""
-        return f"{prefix}:{'_'.join(map(str, args))}"
+    async def _ping_indexer(self):
+        """Keep every pooled client's indexer connection open between requests with a cheap Ping RPC"""
+        # The SDK already polls the latest block on each chain channel, which keeps those open
+        while True:
+            await asyncio.sleep(settings.grpc_ping_interval_seconds)
+            results = await asyncio.gather(*(client.fetch_ping() for client in self._clients), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    log.debug("Indexer ping failed", exc_info=result)
     
-    def _parse_price(self, price_str: str, decimals: int = 6) -> float:
-        """Parse price string to float - Injective typically uses 6 decimals for prices"""
-        try:
-            return float(price_str) / (10 ** decimals)
-        except:
-            return 0.0
+    async def close(self):
+        """Close the gRPC channels of every pooled client"""
+        if self._initialized:
+            tasks = list(self._orderbook_streams.values())
+            if self._ping_task is not None:
+                tasks.append(self._ping_task)
+                self._ping_task = None
+            for task in tasks:
+                task.cancel()
+            # Let the streams unsubscribe before their channels close
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for client in self._clients:
+                await client.close_chain_channel()
+                await client.close_exchange_channel()
+            self._clients = []
+            self._client_cycle = None
+            await self._cache.close()
+            self._initialized = False
+    
+    async def _limited(self, call: Awaitable[Any]) -> Any:
+        """Await an upstream RPC under the service-wide concurrency limit"""
+        async with self._upstream_limit:
+            return await call
+    
+    async def _call_raw(self, api: Any, method: str, request: Any) -> Any:
+        """
+        Call an SDK API's gRPC method and return the protobuf response as-is.
+        
+        The SDK's fetch_* wrappers run every response through MessageToDict,
+        which converts the whole payload even when only part of it is used.
+        """
+        cookie_assistant = api._assistant._cookie_assistant
+        grpc_call = getattr(api._stub, method)(request, metadata=cookie_assistant.metadata())
+        response = await grpc_call
+        await cookie_assistant.process_response_metadata(grpc_call=grpc_call)
+        return response
+    
+    def _split_by_type(self, market_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Split market IDs into those to query as derivatives and as spot; unknown IDs go to both"""
+        derivative_ids = [market_id for market_id in market_ids if self._market_types.get(market_id) != "spot"]
+        spot_ids = [market_id for market_id in market_ids if self._market_types.get(market_id) != "derivative"]
+        return derivative_ids, spot_ids
     
-    def _parse_quantity(self, quantity_str: str, decimals: int = 18) -> float:
-        """Parse quantity string to float - Injective typically uses 18 decimals for quantities"""
+    async def _cached(self, cache_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for a key, fetching it on a miss.
+        
+        Concurrent misses for the same key share a single in-flight fetch
+        instead of each issuing their own upstream call. A local miss checks
+        the shared cache before going upstream. `None` results are not cached.
+        If the request that owns a shared fetch is cancelled, its waiters retry.
+        """
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only propagate our own cancellation, not the owner's abandoned fetch
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await self._cached(cache_key, fetch)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
         try:
-            return float(quantity_str) / (10 ** decimals)
-        except:
-            return 0.0
+            result = await self._cache.get_shared(cache_key)
+            if result is None:
+                result = await fetch()
+                if result is not None:
+                    await self._cache.set(cache_key, result)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved in case nobody else was waiting
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[cache_key]
+    
+    def _parse_price(self, price_str: str, price_divisor: float) -> float:
+        """Parse a chain decimal price string to float, on the same scale as orderbook prices"""
+        # Protobuf decimal strings are well-formed, or empty when unset. Shifting
+        # the decimal point exactly keeps round prices round after the division.
+        return float(Decimal(price_str or 0).scaleb(-_CHAIN_DECIMAL_PLACES)) / price_divisor
+    
+    def _build_summary(self, market_id: str, market_type: str, result: Any, price_divisor: float) -> Dict[str, Any]:
+        """Build a market summary from a protobuf full market with optional mark/mid prices"""
+        # Get mark price if available (derivatives only)
+        mark_price = 0.0
+        if market_type == "derivative":
+            mark_price = self._parse_price(result.mark_price, price_divisor)
+        
+        # Get mid price from TOB if available
+        mid_price = mark_price
+        if result.HasField('mid_price_and_tob'):
+            mid_price = self._parse_price(result.mid_price_and_tob.mid_price, price_divisor)
+        
+        return {
+            "market_id": market_id,
+            "ticker": result.market.ticker,
+            "type": market_type,
+            "last_price": mid_price,
+            "volume_24h": 0,  # Need to fetch from trades
+            "price_change_24h": 0,  # Would need historical data
+            "timestamp": now_iso(),
+        }
     
     async def get_all_markets(self) -> List[Dict[str, Any]]:
         """Get all derivative and spot markets"""
         await self.ensure_initialized()
         
-        cache_key = self._get_cache_key("all_markets")
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        
+        return await self._cached(_ALL_MARKETS_KEY, self._fetch_all_markets)
+    
+    async def _fetch_all_markets(self) -> List[Dict[str, Any]]:
+        """Fetch all derivative and spot markets from the chain"""
         try:
             markets = []
             
-            # Get derivative markets
-            try:
-                derivative_result = await self.client.fetch_chain_derivative_markets()
-                if 'markets' in derivative_result:
-                    for item in derivative_result['markets']:
-                        if 'market' in item:
-                            market = item['market']
-                            markets.append({
-                                "market_id": market.get('marketId', ''),
-                                "ticker": market.get('ticker', ''),
-                                "base_denom": market.get('quoteDenom', ''),
-                                "quote_denom": market.get('quoteDenom', ''),
-                                "type": "derivative",
-                                "oracle_base": market.get('oracleBase', ''),
-                                "oracle_quote": market.get('oracleQuote', ''),
-                                "oracle_type": market.get('oracleType', ''),
-                            })
-            except Exception as e:
-                print(f"Error fetching derivative markets: {e}")
+            chain_api = self.client.chain_exchange_api
+            derivative_result, spot_result = await asyncio.gather(
+                self._limited(self._call_raw(
+                    chain_api, "DerivativeMarkets", exchange_query_pb.QueryDerivativeMarketsRequest(),
+                )),
+                self._limited(self._call_raw(
+                    chain_api, "SpotMarkets", exchange_query_pb.QuerySpotMarketsRequest(),
+                )),
+                return_exceptions=True,
+            )
             
-            # Get spot markets
-            try:
-                spot_result = await self.client.fetch_chain_spot_markets()
-                if 'markets' in spot_result:
-                    for item in spot_result['markets']:
-                        if 'market' in item:
-                            market = item['market']
-                            markets.append({
-                                "market_id": market.get('marketId', ''),
-                                "ticker": market.get('ticker', ''),
-                                "base_denom": market.get('baseDenom', ''),
-                                "quote_denom": market.get('quoteDenom', ''),
-                                "type": "spot",
-                            })
-            except Exception as e:
-                print(f"Error fetching spot markets: {e}")
+            # Derivative markets
+            if isinstance(derivative_result, Exception):
+                log.warning("Error fetching derivative markets", exc_info=derivative_result)
+            else:
+                for item in derivative_result.markets:
+                    if item.HasField('market'):
+                        market = item.market
+                        markets.append({
+                            "market_id": market.market_id,
+                            "ticker": market.ticker,
+                            "base_denom": market.quote_denom,
+                            "quote_denom": market.quote_denom,
+                            "type": "derivative",
+                            "oracle_base": market.oracle_base,
+                            "oracle_quote": market.oracle_quote,
+                            "oracle_type": _ORACLE_TYPES.get(market.oracle_type, str(market.oracle_type)),
+                        })
             
-            self._cache[cache_key] = markets
+            # Spot markets (the chain returns these unwrapped, without a 'market' field)
+            if isinstance(spot_result, Exception):
+                log.warning("Error fetching spot markets", exc_info=spot_result)
+            else:
+                for market in spot_result.markets:
+                    markets.append({
+                        "market_id": market.market_id,
+                        "ticker": market.ticker,
+                        "base_denom": market.base_denom,
+                        "quote_denom": market.quote_denom,
+                        "type": "spot",
+                    })
+            
+            self._market_types.update((market["market_id"], market["type"]) for market in markets)
             return markets
         
-        except Exception as e:
-            print(f"Error fetching markets: {e}")
+        except Exception:
+            log.exception("Error fetching markets")
             return []
     
+    async def _get_market_scales(self) -> Dict[str, List[float]]:
+        """Get per-market [price, quantity] divisors for prices and quantities, keyed by market_id"""
+        await self.ensure_initialized()
+        
+        return await self._cached(_MARKET_SCALES_KEY, self._fetch_market_scales)
+    
+    async def _fetch_market_scales(self) -> Dict[str, List[float]]:
+        """Derive each market's divisors once from its token decimals in the indexer metadata"""
+        client = self.client
+        derivative_result, spot_result = await asyncio.gather(
+            self._limited(self._call_raw(
+                client.exchange_derivative_api, "Markets", derivative_exchange_pb.MarketsRequest(),
+            )),
+            self._limited(self._call_raw(
+                client.exchange_spot_api, "Markets", spot_exchange_pb.MarketsRequest(),
+            )),
+            return_exceptions=True,
+        )
+        if isinstance(derivative_result, Exception) and isinstance(spot_result, Exception):
+            log.warning("Error fetching market decimals", exc_info=derivative_result)
+            # Cached like any result, so an indexer outage costs one retry per TTL rather than one per miss
+            return {}
+        
+        scales = {}
+        
+        # Spot prices are quoted per base unit; quantities are in base units
+        if isinstance(spot_result, Exception):
+            log.warning("Error fetching spot market decimals", exc_info=spot_result)
+        else:
+            for market in spot_result.markets:
+                if market.HasField('base_token_meta') and market.HasField('quote_token_meta'):
+                    base_decimals = market.base_token_meta.decimals
+                    quote_decimals = market.quote_token_meta.decimals
+                    scales[market.market_id] = [10.0 ** (quote_decimals - base_decimals), 10.0 ** base_decimals]
+        
+        # Derivative prices are in quote units; quantities are already human-readable
+        if isinstance(derivative_result, Exception):
+            log.warning("Error fetching derivative market decimals", exc_info=derivative_result)
+        else:
+            for market in derivative_result.markets:
+                if market.HasField('quote_token_meta'):
+                    scales[market.market_id] = [10.0 ** market.quote_token_meta.decimals, 1.0]
+        
+        return scales
+    
     async def get_market_summary(self, market_id: str) -> Optional[Dict[str, Any]]:
         """Get market summary with price, volume, and 24h change"""
+        if not _MARKET_ID_PATTERN.fullmatch(market_id):
+            return None
         await self.ensure_initialized()
         
-        cache_key = self._get_cache_key("market_summary", market_id)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = f"market_summary:{market_id}"
+        return await self._cached(cache_key, lambda: self._fetch_market_summary(market_id))
+    
+    async def _fetch_market_summary(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a market summary as part of the next batched summaries call"""
+        return await self._summary_batcher.submit(market_id)
+    
+    async def get_all_market_summaries(self) -> Dict[str, Dict[str, Any]]:
+        """Get summaries for every market in two bulk calls, keyed by market_id"""
+        await self.ensure_initialized()
         
+        return await self._cached(_ALL_MARKET_SUMMARIES_KEY, self._fetch_market_summaries)
+    
+    async def _fetch_market_summaries(self, market_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch summaries with mid prices for the given markets (all markets if None), keyed by market_id"""
         try:
-            # Try derivative market first
-            try:
-                result = await self.client.fetch_derivative_market(market_id=market_id)
-                if 'market' in result:
-                    market_data = result['market']
-                    
-                    # Get mark price if available
-                    mark_price = 0.0
-                    if 'markPrice' in result:
-                        mark_price = self._parse_price(result['markPrice'])
-                    
-                    # Get mid price from TOB if available
-                    mid_price = mark_price
-                    if 'midPriceAndTob' in result and 'midPrice' in result['midPriceAndTob']:
-                        mid_price = self._parse_price(result['midPriceAndTob']['midPrice'])
-                    
-                    summary = {
-                        "market_id": market_id,
-                        "ticker": market_data.get('ticker', ''),
-                        "type": "derivative",
-                        "last_price": mid_price,
-                        "volume_24h": 0,  # Need to fetch from trades
-                        "price_change_24h": 0,  # Would need historical data
-                        "timestamp": datetime.utcnow().isoformat(),
-                    }
-                    
-                    self._cache[cache_key] = summary
-                    return summary
-            except Exception as e:
-                print(f"Derivative market error: {e}")
+            summaries = {}
             
-            # Try spot market
-            try:
-                result = await self.client.fetch_spot_market(market_id=market_id)
-                if 'market' in result:
-                    market_data = result['market']
-                    
-                    # Get mid price from TOB if available
-                    mid_price = 0.0
-                    if 'midPriceAndTob' in result and 'midPrice' in result['midPriceAndTob']:
-                        mid_price = self._parse_price(result['midPriceAndTob']['midPrice'])
-                    
-                    summary = {
-                        "market_id": market_id,
-                        "ticker": market_data.get('ticker', ''),
-                        "type": "spot",
-                        "last_price": mid_price,
-                        "volume_24h": 0,  # Need to fetch from trades
-                        "price_change_24h": 0,  # Would need historical data
-                        "timestamp": datetime.utcnow().isoformat(),
-                    }
-                    
-                    self._cache[cache_key] = summary
-                    return summary
-            except Exception as e:
-                print(f"Spot market error: {e}")
+            # Markets of a known type are only looked up on their own endpoint; an empty
+            # ID list would mean every market upstream, so that call is skipped instead
+            derivative_ids = spot_ids = market_ids
+            if market_ids is not None:
+                derivative_ids, spot_ids = self._split_by_type(market_ids)
             
+            chain_api = self.client.chain_exchange_api
+            scales, derivative_result, spot_result = await asyncio.gather(
+                self._get_market_scales(),
+                self._limited(self._call_raw(
+                    chain_api, "DerivativeMarkets",
+                    exchange_query_pb.QueryDerivativeMarketsRequest(
+                        market_ids=derivative_ids, with_mid_price_and_tob=True,
+                    ),
+                )) if derivative_ids is None or derivative_ids else _resolved(exchange_query_pb.QueryDerivativeMarketsResponse()),
+                self._limited(self._call_raw(
+                    chain_api, "FullSpotMarkets",
+                    exchange_query_pb.QueryFullSpotMarketsRequest(
+                        market_ids=spot_ids, with_mid_price_and_tob=True,
+                    ),
+                )) if spot_ids is None or spot_ids else _resolved(exchange_query_pb.QueryFullSpotMarketsResponse()),
+                return_exceptions=True,
+            )
+            if isinstance(scales, Exception):
+                scales = {}
+            
+            # Spot first so a derivative market with the same ID takes precedence
+            for market_type, result in (("spot", spot_result), ("derivative", derivative_result)):
+                if isinstance(result, Exception):
+                    log.warning("Error fetching %s market summaries", market_type, exc_info=result)
+                    continue
+                for item in result.markets:
+                    if item.HasField('market'):
+                        market_id = item.market.market_id
+                        price_divisor = scales.get(market_id, _DEFAULT_SCALES)[0]
+                        summaries[market_id] = self._build_summary(market_id, market_type, item, price_divisor)
+                        self._market_types[market_id] = market_type
+            
+            return summaries
+        
+        except Exception:
+            log.exception("Error fetching market summaries")
+            return {}
+    
+    async def get_market_summary_model(self, market_id: str) -> Optional[MarketSummary]:
+        """Get market summary as a validated model, reused while the raw summary is unchanged"""
+        summary = await self.get_market_summary(market_id)
+        if not summary:
+            return None
+        
+        cached = self._summary_model_cache.get(market_id)
+        if cached is not None and cached[0] == summary:
+            return cached[1]
+        
+        model = MarketSummary(**summary)
+        self._summary_model_cache[market_id] = (summary, model)
+        return model
+    
+    async def get_orderbook(self, market_id: str, depth: int = 100) -> Optional[Dict[str, Any]]:
+        """Get current orderbook for a market, limited to `depth` levels per side"""
+        entry = await self._get_orderbook_entry(market_id)
+        if not entry:
             return None
         
-        except Exception as e:
-            print(f"Error fetching market summary: {e}")
+        orderbook = entry["orderbook"]
+        if depth >= 100:
+            return orderbook
+        
+        # Slice into a new dict so the cached full book is never truncated
+        return {
+            **orderbook,
+            "bids": orderbook["bids"][:depth],
+            "asks": orderbook["asks"][:depth],
+        }
+    
+    async def get_orderbook_stats(self, market_id: str) -> Optional[Dict[str, float]]:
+        """Get spread percentage and liquidity score derived from the cached orderbook"""
+        entry = await self._get_orderbook_entry(market_id)
+        if not entry:
             return None
+        
+        return {
+            "spread_percentage": entry["spread_percentage"],
+            "liquidity_score": entry["liquidity_score"],
+        }
     
-    async def get_orderbook(self, market_id: str) -> Optional[Dict[str, Any]]:
-        """Get current orderbook for a market"""
+    async def _get_orderbook_entry(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Get the cached top-100 orderbook for a market along with its derived stats"""
+        if not _MARKET_ID_PATTERN.fullmatch(market_id):
+            return None
         await self.ensure_initialized()
         
-        cache_key = self._get_cache_key("orderbook", market_id)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = f"orderbook:{market_id}"
+        entry = await self._cached(cache_key, lambda: self._fetch_orderbook_entry(market_id))
+        if entry and settings.orderbook_stream_idle_seconds > 0:
+            self._watch_orderbook(market_id, entry["orderbook"]["type"])
+        return entry
+    
+    async def _fetch_orderbook_entry(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch an orderbook and compute its stats once, so cache hits skip the math"""
+        orderbook = await self._fetch_orderbook(market_id)
+        if orderbook is None:
+            return None
         
+        return self._orderbook_entry(orderbook)
+    
+    def _orderbook_entry(self, orderbook: Dict[str, Any]) -> Dict[str, Any]:
+        """Bundle an orderbook with its spread and liquidity stats for caching"""
+        return {
+            "orderbook": orderbook,
+            "spread_percentage": calculate_spread(orderbook),
+            "liquidity_score": calculate_liquidity_score(orderbook),
+        }
+    
+    def _watch_orderbook(self, market_id: str, market_type: str):
+        """Mark a market's orderbook as in use, subscribing to its snapshot stream if it has none"""
+        now = time.monotonic()
+        if market_id in self._orderbook_streams:
+            self._orderbook_last_used[market_id] = now
+            return
+        
+        # Markets over the cap, or whose stream just ended without going idle, stay on polled reads
+        if len(self._orderbook_streams) >= settings.max_orderbook_streams:
+            return
+        if self._orderbook_stream_retry_at.get(market_id, 0) > now:
+            return
+        self._orderbook_stream_retry_at.pop(market_id, None)
+        
+        self._orderbook_last_used[market_id] = now
+        task = asyncio.get_running_loop().create_task(self._stream_orderbook(market_id, market_type))
+        self._orderbook_streams[market_id] = task
+    
+    async def _stream_orderbook(self, market_id: str, market_type: str):
+        """Keep a market's cached orderbook streamed until nobody has read the market for the idle timeout"""
+        # With a shared cache one worker streams each market; the others read its snapshots from Redis
+        lease = f"orderbook_stream:{market_id}"
+        reader = None
+        idle = False
         try:
-            # Try derivative orderbook
-            try:
-                result = await self.client.fetch_derivative_orderbook_v2(market_id=market_id)
-                if 'orderbook' in result:
-                    ob = result['orderbook']
-                    
-                    bids = []
-                    for bid in ob.get('buys', [])[:100]:
-                        bids.append({
-                            "price": self._parse_price(bid.get('price', '0')),
-                            "quantity": self._parse_quantity(bid.get('quantity', '0'))
-                        })
-                    
-                    asks = []
-                    for ask in ob.get('sells', [])[:100]:
-                        asks.append({
-                            "price": self._parse_price(ask.get('price', '0')),
-                            "quantity": self._parse_quantity(ask.get('quantity', '0'))
-                        })
-                    
-                    orderbook_data = {
-                        "market_id": market_id,
-                        "type": "derivative",
-                        "bids": bids,
-                        "asks": asks,
-                        "timestamp": datetime.utcnow().isoformat(),
-                    }
-                    
-                    self._cache[cache_key] = orderbook_data
-                    return orderbook_data
-            except Exception as e:
-                print(f"Derivative orderbook error: {e}")
+            if not await self._cache.claim(lease, _STREAM_LEASE_SECONDS):
+                return
+            
+            reader = asyncio.ensure_future(self._read_orderbook_stream(market_id, market_type))
+            # Checked on a timer rather than per snapshot, so quiet markets unsubscribe too
+            while not reader.done():
+                idle_deadline = self._orderbook_last_used[market_id] + settings.orderbook_stream_idle_seconds
+                remaining = idle_deadline - time.monotonic()
+                if remaining <= 0:
+                    idle = True
+                    break
+                await asyncio.wait({reader}, timeout=min(remaining, _STREAM_LEASE_SECONDS / 3))
+                if not reader.done() and not await self._cache.claim(lease, _STREAM_LEASE_SECONDS):
+                    break
+        finally:
+            if reader is not None:
+                reader.cancel()
+                await asyncio.wait({reader})
+                await self._cache.release(lease)
+            self._orderbook_streams.pop(market_id, None)
+            self._orderbook_last_used.pop(market_id, None)
+            # An idle stream resubscribes on the next read; any other ending waits a while first
+            if not idle:
+                self._orderbook_stream_retry_at[market_id] = time.monotonic() + settings.orderbook_stream_retry_seconds
+    
+    async def _read_orderbook_stream(self, market_id: str, market_type: str):
+        """Write each snapshot from a market's orderbook stream into the cache"""
+        client = self.client
+        if market_type == "derivative":
+            api = client.exchange_derivative_stream_api
+            request = derivative_exchange_pb.StreamOrderbookV2Request(market_ids=[market_id])
+        else:
+            api = client.exchange_spot_stream_api
+            request = spot_exchange_pb.StreamOrderbookV2Request(market_ids=[market_id])
+        
+        cache_key = f"orderbook:{market_id}"
+        try:
+            # Snapshots live in the shared cache for as long as the market is read, so they are
+            # never written on fallback scales; the polled path covers markets without metadata
+            if market_id not in await self._get_market_scales():
+                return
             
-            # Try spot orderbook
+            cookie_assistant = api._assistant._cookie_assistant
+            stream = api._stub.StreamOrderbookV2(request, metadata=cookie_assistant.metadata())
             try:
-                result = await self.client.fetch_spot_orderbook_v2(market_id=market_id)
-                if 'orderbook' in result:
-                    ob = result['orderbook']
-                    
-                    bids = []
-                    for bid in ob.get('buys', [])[:100]:
-                        bids.append({
-                            "price": self._parse_price(bid.get('price', '0')),
-                            "quantity": self._parse_quantity(bid.get('quantity', '0'))
-                        })
-                    
-                    asks = []
-                    for ask in ob.get('sells', [])[:100]:
-                        asks.append({
-                            "price": self._parse_price(ask.get('price', '0')),
-                            "quantity": self._parse_quantity(ask.get('quantity', '0'))
-                        })
-                    
-                    orderbook_data = {
-                        "market_id": market_id,
-                        "type": "spot",
-                        "bids": bids,
-                        "asks": asks,
-                        "timestamp": datetime.utcnow().isoformat(),
-                    }
-                    
-                    self._cache[cache_key] = orderbook_data
-                    return orderbook_data
-            except Exception as e:
-                print(f"Spot orderbook error: {e}")
+                async for event in stream:
+                    if event.HasField('orderbook'):
+                        # Looked up per snapshot so the stream follows the scales cache as it refreshes
+                        scales = (await self._get_market_scales()).get(market_id)
+                        if scales is None:
+                            break
+                        orderbook = self._build_orderbook(market_id, market_type, event.orderbook, scales)
+                        await self._cache.set(cache_key, self._orderbook_entry(orderbook))
+            finally:
+                stream.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("Orderbook stream for %s ended", market_id, exc_info=True)
+    
+    async def _fetch_orderbook(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch the top-100 orderbook as part of the next batched orderbooks call"""
+        return await self._orderbook_batcher.submit(market_id)
+    
+    async def _fetch_orderbooks(self, market_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch top-100 orderbooks for several markets, keyed by market_id"""
+        try:
+            orderbooks = {}
             
-            return None
+            # Markets of a known type are only looked up on their own endpoint
+            derivative_ids, spot_ids = self._split_by_type(market_ids)
+            
+            # Raw protobuf responses, so only the top 100 levels of each book get converted
+            client = self.client
+            scales, derivative_result, spot_result = await asyncio.gather(
+                self._get_market_scales(),
+                self._limited(self._call_raw(
+                    client.exchange_derivative_api, "OrderbooksV2",
+                    derivative_exchange_pb.OrderbooksV2Request(market_ids=derivative_ids),
+                )) if derivative_ids else _resolved(derivative_exchange_pb.OrderbooksV2Response()),
+                self._limited(self._call_raw(
+                    client.exchange_spot_api, "OrderbooksV2",
+                    spot_exchange_pb.OrderbooksV2Request(market_ids=spot_ids),
+                )) if spot_ids else _resolved(spot_exchange_pb.OrderbooksV2Response()),
+                return_exceptions=True,
+            )
+            if isinstance(scales, Exception):
+                scales = {}
+            
+            # Spot first so a derivative orderbook with the same ID takes precedence
+            for market_type, result in (("spot", spot_result), ("derivative", derivative_result)):
+                if isinstance(result, Exception):
+                    log.warning("Error fetching %s orderbooks", market_type, exc_info=result)
+                    continue
+                for item in result.orderbooks:
+                    if item.HasField('orderbook'):
+                        orderbooks[item.market_id] = self._build_orderbook(
+                            item.market_id, market_type, item.orderbook, scales.get(item.market_id, _DEFAULT_SCALES),
+                        )
+                        self._market_types[item.market_id] = market_type
+            
+            return orderbooks
         
-        except Exception as e:
-            print(f"Error fetching orderbook: {e}")
-            return None
+        except Exception:
+            log.exception("Error fetching orderbooks")
+            return {}
+    
+    def _build_orderbook(self, market_id: str, market_type: str, ob: Any, scales: Sequence[float]) -> Dict[str, Any]:
+        """Build orderbook data from the top 100 levels of an upstream protobuf orderbook"""
+        return {
+            "market_id": market_id,
+            "type": market_type,
+            "bids": self._parse_levels(ob.buys, scales),
+            "asks": self._parse_levels(ob.sells, scales),
+            "timestamp": now_iso(),
+        }
+    
+    def _parse_levels(self, levels: Any, scales: Sequence[float]) -> List[Dict[str, float]]:
+        """Parse up to 100 protobuf price levels in one vectorized pass per column"""
+        price_divisor, quantity_divisor = scales
+        # Slicing the repeated field only wraps the first 100 levels
+        levels = levels[:100]
+        prices = _decode([level.price for level in levels], price_divisor)
+        quantities = _decode([level.quantity for level in levels], quantity_divisor)
+        return [
+            {"price": price, "quantity": quantity}
+            for price, quantity in zip(prices, quantities)
+        ]
     
     async def get_recent_trades(self, market_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent trades for a market"""
+        if not _MARKET_ID_PATTERN.fullmatch(market_id):
+            return []
         await self.ensure_initialized()
         
-        cache_key = self._get_cache_key("trades", market_id, limit)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = f"trades:{market_id}_{limit}"
+        return await self._cached(cache_key, lambda: self._fetch_recent_trades(market_id, limit))
+    
+    async def get_recent_trades_payload(self, market_id: str, limit: int = 50) -> bytes:
+        """Get recent trades as JSON bytes, served from the cache without decoding or re-encoding"""
+        cache_key = f"trades:{market_id}_{limit}"
+        payload = self._cache.get_payload(cache_key)
+        if payload is not None:
+            return payload
         
+        trades = await self.get_recent_trades(market_id, limit)
+        # The fetch just cached the encoded list, so reuse it rather than encoding again
+        return self._cache.get_payload(cache_key) or orjson.dumps(trades)
+    
+    async def _fetch_recent_trades(self, market_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Fetch recent trades, using spot trades when no derivative trades exist"""
         try:
+            # A market of known type is only looked up on its own endpoint
+            market_type = self._market_types.get(market_id)
+            client = self.client
+            scales_task = asyncio.ensure_future(self._get_market_scales())
+            derivative_task = asyncio.ensure_future(
+                self._limited(client.fetch_derivative_trades(market_ids=[market_id]))
+                if market_type != "spot" else _resolved({})
+            )
+            spot_task = asyncio.ensure_future(
+                self._limited(client.fetch_spot_trades(market_ids=[market_id]))
+                if market_type != "derivative" else _resolved({})
+            )
+            try:
+                # Derivative trades win, so the spot probe is dropped as soon as derivative trades arrive
+                done, _ = await asyncio.wait({derivative_task, spot_task}, return_when=asyncio.FIRST_COMPLETED)
+                if (
+                    derivative_task in done
+                    and derivative_task.exception() is None
+                    and derivative_task.result().get('trades')
+                ):
+                    spot_task.cancel()
+                
+                scales, derivative_result, spot_result = await asyncio.gather(
+                    scales_task, derivative_task, spot_task, return_exceptions=True,
+                )
+            finally:
+                for task in (scales_task, derivative_task, spot_task):
+                    task.cancel()
+            
+            price_divisor, quantity_divisor = (
+                _DEFAULT_SCALES if isinstance(scales, Exception) else scales.get(market_id, _DEFAULT_SCALES)
+            )
+            
             trades = []
             
-            # Try derivative trades
-            try:
-                result = await self.client.fetch_derivative_trades(market_ids=[market_id])
-                if 'trades' in result:
-                    for trade in result['trades'][:limit]:
-                        # Extract price from positionDelta
-                        price = 0.0
-                        quantity = 0.0
-                        if 'positionDelta' in trade:
-                            delta = trade['positionDelta']
-                            if 'executionPrice' in delta:
-                                price = self._parse_price(delta['executionPrice'])
-                            if 'executionQuantity' in delta:
-                                quantity = self._parse_quantity(delta['executionQuantity'])
-                        
-                        trades.append({
+            # Derivative trades
+            if isinstance(derivative_result, Exception):
+                log.warning("Derivative trades error", exc_info=derivative_result)
+            else:
+                raw = derivative_result.get('trades', [])[:limit]
+                # Extract price from positionDelta
+                deltas = [trade.get('positionDelta', {}) for trade in raw]
+                prices = _decode([delta.get('executionPrice', '0') for delta in deltas], price_divisor)
+                quantities = _decode([delta.get('executionQuantity', '0') for delta in deltas], quantity_divisor)
+                trades = [
+                    {
+                        "price": price,
+                        "quantity": quantity,
+                        "timestamp": str(trade.get('executedAt', '')),
+                        "side": trade.get('executionSide', 'unknown'),
+                    }
+                    for trade, price, quantity in zip(raw, prices, quantities)
+                ]
+            
+            # Spot trades if no derivative trades
+            if not trades:
+                if isinstance(spot_result, Exception):
+                    log.warning("Spot trades error", exc_info=spot_result)
+                else:
+                    raw = spot_result.get('trades', [])[:limit]
+                    levels = [trade.get('price', {}) for trade in raw]
+                    prices = _decode([level.get('price', '0') for level in levels], price_divisor)
+                    quantities = _decode([level.get('quantity', '0') for level in levels], quantity_divisor)
+                    trades = [
+                        {
                             "price": price,
                             "quantity": quantity,
                             "timestamp": str(trade.get('executedAt', '')),
-                            "side": trade.get('executionSide', 'unknown'),
-                        })
-            except Exception as e:
-                print(f"Derivative trades error: {e}")
-            
-            # Try spot trades if no derivative trades
-            if not trades:
-                try:
-                    result = await self.client.fetch_spot_trades(market_ids=[market_id])
-                    if 'trades' in result:
-                        for trade in result['trades'][:limit]:
-                            price = self._parse_price(trade.get('price', {}).get('price', '0'))
-                            quantity = self._parse_quantity(trade.get('price', {}).get('quantity', '0'))
-                            
-                            trades.append({
-                                "price": price,
-                                "quantity": quantity,
-                                "timestamp": str(trade.get('executedAt', '')),
-                                "side": trade.get('tradeDirection', 'unknown'),
-                            })
-                except Exception as e:
-                    print(f"Spot trades error: {e}")
+                            "side": trade.get('tradeDirection', 'unknown'),
+                        }
+                        for trade, price, quantity in zip(raw, prices, quantities)
+                    ]
             
-            self._cache[cache_key] = trades
             return trades
         
-        except Exception as e:
-            print(f"Error fetching trades: {e}")
+        except Exception:
+            log.exception("Error fetching trades")
             return []
     
-    def clear_cache(self):
-        """Clear all cached data"""
-        self._cache.clear()
+    async def clear_cache(self):
+        """Clear all cached data, including the copies shared with other workers"""
+        await self._cache.clear()
+        self._summary_model_cache.clear()
 
 
 # Global service instance
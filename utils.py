@@ -0,0 +1,46 @@
+"""
+Shared helpers for the Injective Market Analytics API
+"""
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import queue
+import time
+
+# (unix second, ISO string) of the last formatted timestamp
+_last_timestamp = (0, "")
+
+
+def now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, formatted at most once per second"""
+    global _last_timestamp
+    second = int(time.time())
+    cached_second, cached_iso = _last_timestamp
+    if second != cached_second:
+        cached_iso = datetime.utcfromtimestamp(second).isoformat()
+        _last_timestamp = (second, cached_iso)
+    return cached_iso
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records unformatted, leaving the formatting to the listener thread"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message and traceback on the calling thread,
+        # so that it can be pickled. An in-process queue never pickles anything.
+        return record
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    """Send log records through a queue so a background thread does the formatting and I/O"""
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(records)]
+    root.setLevel(level)
+    
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return listener